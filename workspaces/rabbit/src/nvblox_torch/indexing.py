@@ -8,7 +8,7 @@
 # without an express license agreement from NVIDIA CORPORATION or
 # its affiliates is strictly prohibited.
 #
-from typing import List
+from typing import List, Union
 
 import torch
 
@@ -65,3 +65,30 @@ def get_voxel_center_grids(block_indices: List[torch.Tensor],
         voxel_center_grid = block_origin + local_voxel_center_grid
         voxel_centers_list.append(voxel_center_grid)
     return voxel_centers_list
+
+
+def get_voxel_centers_flat(block_indices: Union[List[torch.Tensor], torch.Tensor],
+                           voxel_size: float,
+                           device: torch.device = 'cuda') -> torch.Tensor:
+    """Generate the 3D voxel center positions wrt the world for all given blocks as one tensor.
+
+    Equivalent to concatenating the grids of get_voxel_center_grids() viewed as (-1, 3), but
+    computed with a single broadcast into one output tensor.
+
+    Args:
+        block_indices: List of 3D block indices, or an Nx3 tensor of block indices.
+        voxel_size: Size of a voxel in meters.
+        device: Device of the output tensor.
+
+    Returns
+        A (N*8*8*8)x3 tensor on device of type float32.
+
+    """
+    if isinstance(block_indices, list):
+        if len(block_indices) == 0:
+            return torch.zeros((0, 3), dtype=torch.float32, device=device)
+        block_indices = torch.stack(block_indices)
+    voxel_block_size = NUM_VOXELS_PER_SIDE * voxel_size
+    local_voxel_centers = get_local_voxel_center_grid(voxel_size, device=device).view(1, -1, 3)
+    block_origins = block_indices.to(device=device, dtype=torch.float32) * voxel_block_size
+    return (block_origins.view(-1, 1, 3) + local_voxel_centers).view(-1, 3)
@@ -17,6 +17,7 @@ from nvblox_torch.layer import TsdfLayer, ColorLayer
 # pylint: disable=W0212
 
 
+@torch.no_grad()
 def render_depth_image(tsdf_layer: TsdfLayer, camera_pose: torch.Tensor, intrinsics: torch.Tensor,
                        height: int, width: int, max_ray_length: float,
                        max_steps: int) -> torch.Tensor:
@@ -39,6 +40,7 @@ def render_depth_image(tsdf_layer: TsdfLayer, camera_pose: torch.Tensor, intrins
                                                  height, width, max_ray_length, max_steps)
 
 
+@torch.no_grad()
 def render_depth_and_color_image(tsdf_layer: TsdfLayer, color_layer: ColorLayer,
                                  camera_pose: torch.Tensor, intrinsics: torch.Tensor, height: int,
                                  width: int, max_ray_length: float,
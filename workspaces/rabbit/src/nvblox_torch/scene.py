@@ -8,7 +8,8 @@
 # without an express license agreement from NVIDIA CORPORATION or
 # its affiliates is strictly prohibited.
 #
-from typing import Tuple, List
+from typing import Tuple, List, Union
+import numpy.typing as npt
 import torch
 from nvblox_torch.mapper import Mapper
 from nvblox_torch.lib.utils import get_nvblox_torch_class
@@ -16,6 +17,9 @@ from nvblox_torch.projective_integrator_types import ProjectiveIntegratorType
 from nvblox_torch.mapper_params import MapperParams
 from typing import Optional
 
+# Resolve the wrapped C++ class once rather than on every construction.
+_SceneClass = get_nvblox_torch_class('Scene')
+
 
 class Scene:
     """Wrapper around the nvblox Scene class.
@@ -30,19 +34,25 @@ class Scene:
             c_scene: Optional nvblox Scene object to wrap. If None, a new one will be created.
         """
         if c_scene is None:
-            self._c_scene = get_nvblox_torch_class('Scene')()
+            self._c_scene = _SceneClass()
         else:
             self._c_scene = c_scene
 
-    def set_aabb(self, low: List[float], high: List[float]) -> None:
+    def set_aabb(self, low: Union[List[float], torch.Tensor, npt.NDArray],
+                 high: Union[List[float], torch.Tensor, npt.NDArray]) -> None:
         """Set the Axis-Aligned Bounding Box (AABB) of the scene.
 
         Args:
-            low: Lower bounds of the AABB.
-            high: Upper bounds of the AABB.
+            low: Lower bounds of the AABB. List, tensor or numpy array of length 3.
+            high: Upper bounds of the AABB. List, tensor or numpy array of length 3.
         """
         assert len(low) == 3
         assert len(high) == 3
+        # Tensors and numpy arrays are converted; lists are passed to the binding as is.
+        if hasattr(low, 'tolist'):
+            low = low.tolist()
+        if hasattr(high, 'tolist'):
+            high = high.tolist()
         self._c_scene.set_aabb(low, high)
 
     def get_aabb(self) -> Tuple[List[float], List[float]]:
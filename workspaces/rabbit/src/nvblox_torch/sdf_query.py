@@ -9,9 +9,39 @@
 # its affiliates is strictly prohibited.
 #
 from typing import Tuple, Any, Optional
+import threading
 
 import torch
 
+from nvblox_torch.constants import constants
+
+# Scratch buffers used for padding Nx3 queries with zero radii. Kept per thread so that
+# concurrent queries never share a buffer, and keyed by (device, dtype) within a thread.
+_thread_local = threading.local()
+
+
+def _get_padded_query_buffer(num_queries: int, device: torch.device,
+                             dtype: torch.dtype) -> torch.Tensor:
+    """Get a num_queries x 4 scratch tensor owned by the calling thread.
+
+    The underlying buffer is only reallocated when a larger batch than before is queried.
+    """
+    buffers = getattr(_thread_local, 'padded_query_buffers', None)
+    if buffers is None:
+        buffers = {}
+        _thread_local.padded_query_buffers = buffers
+    key = (device, dtype)
+    buffer = buffers.get(key)
+    if buffer is None or buffer.shape[0] < num_queries:
+        buffer = torch.empty(num_queries, 4, device=device, dtype=dtype)
+        buffers[key] = buffer
+    return buffer[:num_queries]
+
+
+def release_query_buffers() -> None:
+    """Release the scratch buffers used for padding Nx3 ESDF queries in the calling thread."""
+    _thread_local.padded_query_buffers = {}
+
 
 class EsdfQuery(torch.autograd.Function):
     """Queries the ESDF at a set of locations.
@@ -50,19 +80,24 @@ class EsdfQuery(torch.autograd.Function):
             A N dimensional tensor containing the distances from the spheres to the surface defined
             by the ESDF.
         """
-        # Add zero radii to the query tensor if not given.  TODO(dtingdahl) Avoid re-allocation here
-        # by making the underlying kernel flexible to receive both Nx3 and Nx4 input.
+        num_queries = query_spheres.shape[0]
+        # Add zero radii to the query tensor if not given. The padded queries are written to a
+        # reused scratch buffer. TODO(dtingdahl) Avoid the copy by making the underlying kernel
+        # flexible to receive both Nx3 and Nx4 input.
         if query_spheres.shape[1] == 3:
-            num_queries = query_spheres.shape[0]
-            zeros = torch.zeros(num_queries,
-                                1,
-                                device=query_spheres.device,
-                                dtype=query_spheres.dtype)
-            query_spheres = torch.cat([query_spheres, zeros], dim=1)
+            padded_query_spheres = _get_padded_query_buffer(num_queries, query_spheres.device,
+                                                             query_spheres.dtype)
+            padded_query_spheres[:, :3].copy_(query_spheres)
+            padded_query_spheres[:, 3].zero_()
+            query_spheres = padded_query_spheres
 
         assert query_spheres.ndim == 2 and query_spheres.shape[1] == 4
         if out_tensor is None:
-            out_tensor = torch.zeros(num_queries, 4)
+            # Allocate on the query device, initialized like Mapper's preallocated ESDF outputs.
+            out_tensor = torch.full((num_queries, 4),
+                                    constants.esdf_unknown_distance(),
+                                    device=query_spheres.device,
+                                    dtype=query_spheres.dtype)
         assert out_tensor.shape == torch.Size([query_spheres.shape[0], 4])
         if mapper_id >= 0 or c_mapper_instance.num_mappers() == 1:
             mapper_id = 0 if mapper_id == -1 else mapper_id
@@ -105,7 +140,9 @@ class EsdfQuery(torch.autograd.Function):
             # NOTE(alexmillane): In the original cuRobo implementation, the gradient
             # with respect to the sphere radius was set to 0.0. In my opinion, it should
             # be -1.0.
-            query_xyzd[:, 3] = -1.0
-            grad_sph = grad_output.unsqueeze(-1) * query_xyzd
+            # The saved tensor aliases the distances returned by forward, so it must not be
+            # modified in place.
+            grad_output = grad_output.unsqueeze(-1)
+            grad_sph = torch.cat([query_xyzd[:, :3] * grad_output, -grad_output], dim=1)
         # We only provide gradients with respect to the query points.
         return grad_sph, None, None, None, None
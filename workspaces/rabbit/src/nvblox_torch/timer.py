@@ -10,32 +10,62 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
+import functools
+import math
+import os
 import time
 from typing import Literal, Any
-import hashlib
+import zlib
 
 import nvtx
+import torch
 
-# Global object for storing name - > accumulator
-_timers = {}
+# NVTX ranges are emitted unless disabled with NVBLOX_NVTX=0
+_NVTX_ENABLED = os.environ.get('NVBLOX_NVTX', '1') != '0'
+
+# CUDA event pairs recorded by stopped timers that have not yet been resolved into _timers
+_pending_cuda_events = []
+
+# Number of pending CUDA event pairs at which they are resolved automatically. Bounds the number
+# of outstanding events (and device syncs to one per this many measurements) in long-running loops.
+_MAX_PENDING_CUDA_EVENTS = 1024
 
 
 class Accumulator:
-    """Holds an an accumulated value + num added elements."""
+    """Holds running statistics of added values.
+
+    Mean and variance are updated with Welford's online algorithm, which stays numerically stable
+    for long runs where a plain running sum would lose precision.
+    """
+
+    __slots__ = ('_num_samples', '_mean', '_m2', '_last_value')
 
     def __init__(self) -> None:
         """Constructor."""
         self._num_samples = 0
-        self._sum = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
         self._last_value = 0.0
 
     def mean(self) -> float:
         """Get the mean value."""
         if self._num_samples > 0:
-            return self._sum / self._num_samples
+            return self._mean
         else:
             return -1
 
+    def variance(self) -> float:
+        """Get the (population) variance of the added values."""
+        if self._num_samples > 0:
+            return self._m2 / self._num_samples
+        else:
+            return 0.0
+
+    def std(self) -> float:
+        """Get the (population) standard deviation of the added values."""
+        return math.sqrt(self.variance())
+
     def last(self) -> float | None:
         """Get the most recently added value."""
         return self._last_value
@@ -46,21 +76,25 @@ class Accumulator:
 
     def sum(self) -> float:
         """Get the current sum."""
-        return self._sum
+        return self._mean * self._num_samples
 
     def accumulate(self, value: float) -> None:
         """Add a new value to the accumulator."""
-        # Note(dtingdahl) This might be inaccurate if _sum is very large.
-        self._sum += value
         self._num_samples += 1
+        delta = value - self._mean
+        self._mean += delta / self._num_samples
+        self._m2 += delta * (value - self._mean)
         self._last_value = value
 
 
+# Global object for storing name - > accumulator. Accumulators are created on first use.
+_timers: defaultdict[str, Accumulator] = defaultdict(Accumulator)
+
+
+@functools.lru_cache(maxsize=4096)
 def string_to_color(s: str) -> int:
-    """Hash the string using SHA-256 and take the first 3 bytes."""
-    h = hashlib.sha256(s.encode('utf-8')).digest()
-    r, g, b = h[0], h[1], h[2]
-    return (r << 16) + (g << 8) + b    # Equivalent to 0xRRGGBB
+    """Hash the string using CRC32 and take the lower 3 bytes."""
+    return zlib.crc32(s.encode('utf-8')) & 0xFFFFFF    # Equivalent to 0xRRGGBB
 
 
 class Timer:
@@ -76,35 +110,76 @@ class Timer:
         timer = Timer("my_function_timer")
         my_function()
         timer.stop()
+
+    With cuda_events=True, the timer records a pair of CUDA events into the current stream
+    instead of reading the wall clock. No device synchronization takes place when the timer is
+    stopped, so queued kernels keep overlapping. Recorded event pairs are resolved into the
+    accumulated timings by synchronize_cuda_timers(), which is called automatically by the timing
+    getters and once _MAX_PENDING_CUDA_EVENTS pairs are pending.
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, cuda_events: bool = False):
         """Construct and start a timer."""
         self._name = name
-        self._start_time = time.perf_counter()
-        self.nvtx_range = nvtx.start_range(message=name, color=string_to_color(name))
+        self._start_event = None
+        self._start_time_ns = None
+        if cuda_events:
+            self._start_event = torch.cuda.Event(enable_timing=True)
+            self._start_event.record()
+        else:
+            self._start_time_ns = time.perf_counter_ns()
+        self.nvtx_range = None
+        if _NVTX_ENABLED:
+            self.nvtx_range = nvtx.start_range(message=name, color=string_to_color(name))
 
     def __enter__(self) -> Timer:
         """Enable use as a context manager."""
         return self
 
-    def stop(self) -> float:
-        """Stop the timer and store the result in the global timer object. Returns elapsed time."""
-        elapsed = time.perf_counter() - self._start_time
-        nvtx.end_range(self.nvtx_range)
-        if not self._name in _timers:
-            _timers[self._name] = Accumulator()
+    def stop(self) -> float | None:
+        """Stop the timer and store the result in the global timer object. Returns elapsed time.
+
+        CUDA-event timers return None since their elapsed time is only known after
+        synchronize_cuda_timers() has been called.
+        """
+        if self._start_event is not None:
+            end_event = torch.cuda.Event(enable_timing=True)
+            end_event.record()
+            self._end_nvtx_range()
+            _pending_cuda_events.append((self._name, self._start_event, end_event))
+            if len(_pending_cuda_events) >= _MAX_PENDING_CUDA_EVENTS:
+                synchronize_cuda_timers()
+            return None
+        # Integer nanoseconds are converted to seconds only once the interval is known.
+        elapsed = (time.perf_counter_ns() - self._start_time_ns) * 1e-9
+        self._end_nvtx_range()
         _timers[self._name].accumulate(elapsed)
         return elapsed
 
+    def _end_nvtx_range(self) -> None:
+        """End the NVTX range of this timer if one was started."""
+        if self.nvtx_range is not None:
+            nvtx.end_range(self.nvtx_range)
+
     def __exit__(self, exception_type: Any, exception_value: Any, traceback: Any) -> Literal[False]:
         """Stop the timer when context manager is released."""
         self.stop()
         return False    # Returning False will cause any exceptions to be propagated
 
 
+def synchronize_cuda_timers() -> None:
+    """Wait for all pending CUDA-event timers and accumulate their timings."""
+    for (name, start_event, end_event) in _pending_cuda_events:
+        # Waits on whichever device recorded the event. Returns immediately for completed events.
+        end_event.synchronize()
+        # elapsed_time() is in milliseconds while the accumulators store seconds.
+        _timers[name].accumulate(start_event.elapsed_time(end_event) / 1000.0)
+    _pending_cuda_events.clear()
+
+
 def get_last_time(timer_name: str) -> float | None:
     """Return the last measurement added to timer_name."""
+    synchronize_cuda_timers()
     if timer_name in _timers:
         return _timers[timer_name].last()
     else:
@@ -113,6 +188,7 @@ def get_last_time(timer_name: str) -> float | None:
 
 def get_mean_time(timer_name: str) -> float:
     """Return the mean measurement added to timer_name."""
+    synchronize_cuda_timers()
     if timer_name in _timers:
         return _timers[timer_name].mean()
     else:
@@ -121,22 +197,26 @@ def get_mean_time(timer_name: str) -> float:
 
 def timer_status_string() -> str:
     """Return a string containing tabulated status of all timers."""
+    synchronize_cuda_timers()
     if len(_timers.keys()) == 0:
         return ''
 
     # How much space do we need for the longest timer name?
     name_field_length = max(len(name) for name in _timers) + 2
 
-    string = '\n'
     fmt_name = '{: <' + str(name_field_length) + '}'
     fmt_int = '{: <20}'
     fmt_flt = '{: <20.3}'
-    string += fmt_name.format('Timer name') + fmt_int.format('Mean[ms]') + fmt_int.format(
-        'Total[s]') + fmt_int.format('Num') + '\n'
-    string += '--------------------------------------------------------------------------------\n'
+    lines = [
+        '',
+        fmt_name.format('Timer name') + fmt_int.format('Mean[ms]') + fmt_int.format('Total[s]') +
+        fmt_int.format('Num'),
+        '--------------------------------------------------------------------------------',
+    ]
     for (name, accumulator) in sorted(_timers.items()):
         mean_ms = 1000 * accumulator.mean()
         num_samples = accumulator.num_samples()
-        string += fmt_name.format(name) + fmt_flt.format(mean_ms) + fmt_flt.format(
-            accumulator.sum()) + fmt_int.format(num_samples) + '\n'
-    return string
+        lines.append(
+            fmt_name.format(name) + fmt_flt.format(mean_ms) + fmt_flt.format(accumulator.sum()) +
+            fmt_int.format(num_samples))
+    return '\n'.join(lines) + '\n'
@@ -12,12 +12,18 @@
 # pylint: disable=invalid-name
 
 import torch
+import torch.nn.functional as F
 
 
+# Scripted to collapse the python dispatch of the small tensor ops into a single graph.
+@torch.jit.script
 def look_at_to_rotation_matrix(center_W: torch.Tensor, look_at_point_W: torch.Tensor,
                                camera_up_W: torch.Tensor) -> torch.Tensor:
     """Generate a rotation matrix from a look-at view-point description.
 
+    Inputs may carry leading batch dimensions, in which case a batch of matrices is returned.
+    camera_up_W may be a single (3,) vector shared by the whole batch.
+
     Args:
         center_W (torch.Tensor): The eye center in the world frame.
         look_at_point_W (torch.Tensor): The point the eye looks at in the world frame.
@@ -26,20 +32,20 @@ def look_at_to_rotation_matrix(center_W: torch.Tensor, look_at_point_W: torch.Te
     Returns:
         torch.Tensor: The 3x3 rotation matrix R_W_C rotating from camera to world.
     """
-    assert len(center_W) == 3
-    assert len(look_at_point_W) == 3
-    assert len(camera_up_W) == 3
+    torch._assert(center_W.shape[-1] == 3, 'center_W should have 3 elements.')
+    torch._assert(look_at_point_W.shape[-1] == 3, 'look_at_point_W should have 3 elements.')
+    torch._assert(camera_up_W.shape[-1] == 3, 'camera_up_W should have 3 elements.')
     # The camera-z is the unit vector pointing from the center to the look at point.
-    z_vec = look_at_point_W - center_W
-    z_vec = z_vec / torch.norm(z_vec)
+    z_vec = F.normalize(look_at_point_W - center_W, dim=-1)
+    # linalg.cross needs inputs with the same number of dimensions, so a single up vector is
+    # broadcast over the batch.
+    camera_up_W = camera_up_W.expand_as(z_vec)
     # Camera up is not necessarily perpendicular to z_vec, so use it to calculate x_vec
-    x_vec = -1.0 * torch.cross(z_vec, camera_up_W)
-    x_vec = x_vec / torch.norm(x_vec)
+    x_vec = F.normalize(-torch.linalg.cross(z_vec, camera_up_W), dim=-1)
     # Calculate remaining vector
-    y_vec = torch.cross(z_vec, x_vec)
-    # Use the unit vectors to form the rotation matrix
-    R_W_C = torch.hstack((x_vec.view((3, 1)), y_vec.view((3, 1)), z_vec.view((3, 1))))
-    assert R_W_C.shape == torch.Size([3, 3])
+    y_vec = torch.linalg.cross(z_vec, x_vec)
+    # Use the unit vectors as the columns of the rotation matrix
+    R_W_C = torch.stack((x_vec, y_vec, z_vec), dim=-1)
     return R_W_C
 
 
@@ -56,8 +62,10 @@ def look_at_to_transformation_matrix(center_W: torch.Tensor, look_at_point_W: to
         torch.Tensor: The 4x4 transformation matrix R_W_C rotating from camera to world.
     """
     R_W_C = look_at_to_rotation_matrix(center_W, look_at_point_W, camera_up_W)
-    t_W_C = center_W
-    T_W_C = torch.vstack((torch.hstack((R_W_C, t_W_C.view(
-        (3, 1)))), torch.tensor([0.0, 0.0, 0.0, 1.0], device=center_W.device)))
-    assert T_W_C.shape == torch.Size([4, 4])
+    # Write the blocks into a single preallocated matrix.
+    T_W_C = torch.zeros(R_W_C.shape[:-2] + (4, 4), device=R_W_C.device, dtype=R_W_C.dtype)
+    T_W_C[..., :3, :3] = R_W_C
+    T_W_C[..., :3, 3] = center_W
+    T_W_C[..., 3, 3] = 1.0
+    assert T_W_C.shape[-2:] == torch.Size([4, 4])
     return T_W_C
@@ -11,8 +11,8 @@
 
 # pylint: disable=invalid-name
 
-import copy
-from typing import Optional
+import functools
+from typing import List, Optional, Tuple, Union
 
 import open3d as o3d
 import torch
@@ -24,6 +24,9 @@ from nvblox_torch.transforms import look_at_to_transformation_matrix
 
 # pylint: disable=invalid-name
 
+# Colormap lookup tables, keyed by (colormap name, device).
+_colormap_luts = {}
+
 
 def to_open3d_pointcloud(pointcloud: npt.NDArray,
                          colors: npt.NDArray,
@@ -45,16 +48,21 @@ def to_open3d_pointcloud(pointcloud: npt.NDArray,
     pcd_o3d = o3d.geometry.PointCloud()
 
     if max_distance is not None:
-        mask = np.linalg.norm(pointcloud, axis=1) < max_distance
+        # Compare squared norms to avoid the square root.
+        squared_norms = np.einsum('ij,ij->i', pointcloud, pointcloud)
+        mask = squared_norms < max_distance**2
+        pointcloud_filtered = pointcloud[mask]
     else:
-        mask = np.ones(pointcloud.shape[0], dtype=bool)
-    pointcloud_filtered = pointcloud[mask]
+        mask = None
+        pointcloud_filtered = pointcloud
     pcd_o3d.points = o3d.utility.Vector3dVector(pointcloud_filtered)
     # Add color to pointcloud
     if colors.shape[0] == 1:
-        colors = np.array([colors[0] for _ in range(len(pointcloud_filtered))])
+        # Zero-copy view repeating the single color for every point.
+        colors = np.broadcast_to(colors, (pointcloud.shape[0], 3))
     assert pointcloud.shape[0] == colors.shape[0]
-    pcd_o3d.colors = o3d.utility.Vector3dVector(colors[mask] / 255.0)
+    colors_filtered = colors if mask is None else colors[mask]
+    pcd_o3d.colors = o3d.utility.Vector3dVector(colors_filtered / 255.0)
     if compute_normals:
         pcd_o3d.estimate_normals()
     return pcd_o3d
@@ -95,6 +103,19 @@ def get_open3d_coordinate_frame(T_W_C: Optional[torch.Tensor] = None,
     return axis
 
 
+@functools.lru_cache
+def _get_cube_template(
+        cube_size_m: float) -> Tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+    """Get vertices, triangles, vertex normals and triangle normals of a box of side cube_size_m.
+
+    Cached per size. The returned arrays are shared between calls and must not be modified.
+    """
+    cube = o3d.geometry.TriangleMesh.create_box(cube_size_m, cube_size_m, cube_size_m)
+    cube.compute_vertex_normals()
+    return (np.array(cube.vertices), np.array(cube.triangles), np.array(cube.vertex_normals),
+            np.array(cube.triangle_normals))
+
+
 def get_voxel_mesh(centers: torch.Tensor,
                    voxel_size_m: float,
                    colors: Optional[torch.Tensor] = None) -> o3d.geometry.TriangleMesh:
@@ -116,18 +137,41 @@ def get_voxel_mesh(centers: torch.Tensor,
         assert centers.shape[0] == colors.shape[0]
     # Visualize
     cube_size_m = 0.9 * voxel_size_m
+    cube_vertices, cube_triangles, cube_vertex_normals, cube_triangle_normals = \
+        _get_cube_template(cube_size_m)
+    num_voxels = centers.shape[0]
+    num_cube_vertices = cube_vertices.shape[0]
+    # Instance the cube at all centers at once rather than merging one translated copy per voxel.
+    vertices = cube_vertices[None, :, :] + centers.cpu().numpy()[:, None, :]
+    vertex_offsets = num_cube_vertices * np.arange(num_voxels)
+    triangles = cube_triangles[None, :, :] + vertex_offsets[:, None, None]
     voxel_mesh = o3d.geometry.TriangleMesh()
-    cube_prototype = o3d.geometry.TriangleMesh.create_box(cube_size_m, cube_size_m, cube_size_m)
-    cube_prototype.compute_vertex_normals()
-    for idx, center in enumerate(centers):
-        cube = copy.deepcopy(cube_prototype)
-        cube.translate(center.cpu().numpy())
-        if colors is not None:
-            cube.paint_uniform_color(colors[idx].cpu().numpy())
-        voxel_mesh += cube
+    voxel_mesh.vertices = o3d.utility.Vector3dVector(vertices.reshape(-1, 3).astype(np.float64))
+    voxel_mesh.triangles = o3d.utility.Vector3iVector(triangles.reshape(-1, 3).astype(np.int32))
+    voxel_mesh.vertex_normals = o3d.utility.Vector3dVector(
+        np.tile(cube_vertex_normals, (num_voxels, 1)))
+    voxel_mesh.triangle_normals = o3d.utility.Vector3dVector(
+        np.tile(cube_triangle_normals, (num_voxels, 1)))
+    if colors is not None:
+        vertex_colors = np.repeat(colors.cpu().numpy(), num_cube_vertices, axis=0)
+        voxel_mesh.vertex_colors = o3d.utility.Vector3dVector(vertex_colors.astype(np.float64))
     return voxel_mesh
 
 
+def _get_colormap_lut(cmap_name: str, device: torch.device) -> torch.Tensor:
+    """Get the RGB lookup table of a matplotlib colormap as a Kx3 tensor on device.
+
+    Tables are built on first use and cached per colormap and device.
+    """
+    key = (cmap_name, torch.device(device))
+    if key not in _colormap_luts:
+        cmap = matplotlib.colormaps.get_cmap(cmap_name)
+        # Remove alpha
+        colors = cmap(np.arange(cmap.N))[:, 0:-1]
+        _colormap_luts[key] = torch.tensor(colors, device=device)
+    return _colormap_luts[key]
+
+
 def get_tsdf_colors(tsdfs: torch.Tensor) -> torch.Tensor:
     """Get colors from TSDF values.
 
@@ -141,12 +185,16 @@ def get_tsdf_colors(tsdfs: torch.Tensor) -> torch.Tensor:
     max_tsdf = torch.max(tsdfs)
     min_tsdf = torch.min(tsdfs)
     tsdfs_normalized = (tsdfs - min_tsdf) / (max_tsdf - min_tsdf)
-    cmap = matplotlib.colormaps.get_cmap('plasma')
-    colors = cmap(tsdfs_normalized.cpu().numpy())
-    # Remove alpha
-    colors = np.squeeze(colors[..., 0:-1])
+    lut = _get_colormap_lut('plasma', tsdfs.device)
+    # Same binning as matplotlib's colormap lookup, but performed on the tensor's device.
+    # Normalized values are NaN when all TSDFs are equal. Like matplotlib, such values are mapped to
+    # the colormap's "bad" color (black) rather than to an arbitrary table entry.
+    is_valid = ~torch.isnan(tsdfs_normalized)
+    lut_indices = (torch.nan_to_num(tsdfs_normalized) * lut.shape[0]).long().clamp_(
+        0, lut.shape[0] - 1)
+    colors = lut[lut_indices] * is_valid.unsqueeze(-1)
     assert colors.shape[-1] == 3
-    return torch.tensor(colors, device=tsdfs.device)
+    return colors
 
 
 def get_tsdf_visualization_o3d(tsdfs: torch.Tensor, voxel_centers_m: torch.Tensor,
@@ -169,10 +217,50 @@ def get_tsdf_visualization_o3d(tsdfs: torch.Tensor, voxel_centers_m: torch.Tenso
     return get_voxel_mesh(voxel_centers_m, voxel_size_m, tsdf_colors)
 
 
+def get_segment_meshes(positions_start: torch.Tensor, positions_end: torch.Tensor,
+                       radius: float) -> List[o3d.geometry.TriangleMesh]:
+    """Gets meshes of segments joining pairs of positions.
+
+    The transforms of all segments are computed as one batch and copied to the host once.
+
+    Args:
+        positions_start: Nx3 first end-points
+        positions_end: Nx3 second end-points
+        radius: Radius of the cylinder meshes.
+
+    Returns:
+        A list of N meshes of the connections.
+    """
+    assert positions_start.shape == positions_end.shape
+    assert positions_start.dim() == 2 and positions_start.shape[-1] == 3
+    centers = (positions_end - positions_start) / 2.0 + positions_start
+    lengths = torch.linalg.vector_norm(positions_end - positions_start, dim=-1)
+    camera_up_W = torch.tensor([0.0, 0.0, 1.0],
+                               device=positions_start.device,
+                               dtype=positions_start.dtype)
+    T_W_C = look_at_to_transformation_matrix(center_W=centers,
+                                             look_at_point_W=positions_start,
+                                             camera_up_W=camera_up_W)
+    T_W_C_np = T_W_C.cpu().numpy()
+    lengths_np = lengths.cpu().numpy()
+    segments = []
+    for T, length in zip(T_W_C_np, lengths_np):
+        segment = o3d.geometry.TriangleMesh.create_cylinder(
+            radius=radius,
+            height=float(length),
+        )
+        segment.compute_vertex_normals()
+        segment.transform(T)
+        segments.append(segment)
+    return segments
+
+
 def get_segment_mesh(position_start: torch.Tensor, position_end: torch.Tensor,
                      radius: float) -> o3d.geometry.TriangleMesh:
     """Gets a mesh of a segment joining two positions.
 
+    Thin wrapper around get_segment_meshes(). Prefer the batched version for many segments.
+
     Args:
         position_start: First end-point
         position_end: Second end-point
@@ -181,20 +269,41 @@ def get_segment_mesh(position_start: torch.Tensor, position_end: torch.Tensor,
     Returns:
         A mesh of the connection.
     """
-    center = (position_end - position_start) / 2.0 + position_start
-    length = torch.norm(position_end - position_start)
-    device = position_start.device
-    T_W_C = look_at_to_transformation_matrix(center_W=center,
-                                             look_at_point_W=position_start,
-                                             camera_up_W=torch.tensor([0.0, 0.0, 1.0],
-                                                                      device=device))
-    segment = o3d.geometry.TriangleMesh.create_cylinder(
-        radius=radius,
-        height=length,
-    )
-    segment.compute_vertex_normals()
-    segment.transform(T_W_C.cpu().numpy())
-    return segment
+    return get_segment_meshes(position_start.view(1, 3), position_end.view(1, 3), radius)[0]
+
+
+def get_sphere_meshes(positions: torch.Tensor,
+                      radii: Union[torch.Tensor, float],
+                      colors: Optional[npt.NDArray] = None) -> List[o3d.geometry.TriangleMesh]:
+    """Get sphere meshes at a set of positions.
+
+    The positions (and radii, if given as a tensor) are copied to the host once.
+
+    Args:
+        positions: Nx3 position tensor
+        radii: N radii tensor, or a single radius for all spheres
+        colors: Optional Nx3 colors
+
+    Returns:
+        A list of N sphere meshes.
+    """
+    assert positions.dim() == 2 and positions.shape[-1] == 3
+    num_spheres = positions.shape[0]
+    positions_np = positions.cpu().numpy()
+    if isinstance(radii, torch.Tensor):
+        radii = radii.cpu().numpy()
+    radii_np = np.broadcast_to(radii, (num_spheres, ))
+    if colors is not None:
+        assert colors.shape == (num_spheres, 3)
+    spheres = []
+    for idx in range(num_spheres):
+        sphere = o3d.geometry.TriangleMesh.create_sphere(radius=float(radii_np[idx]))
+        sphere.compute_vertex_normals()
+        sphere.translate(positions_np[idx])
+        if colors is not None:
+            sphere.paint_uniform_color(colors[idx])
+        spheres.append(sphere)
+    return spheres
 
 
 def get_sphere_mesh(position: torch.Tensor,
@@ -202,6 +311,8 @@ def get_sphere_mesh(position: torch.Tensor,
                     color: Optional[npt.NDArray] = None) -> o3d.geometry.TriangleMesh:
     """Get a spere mesh at a position.
 
+    Thin wrapper around get_sphere_meshes(). Prefer the batched version for many spheres.
+
     Args:
         position: 3D position tensor
         radius: radius of the sphere
@@ -209,9 +320,5 @@ def get_sphere_mesh(position: torch.Tensor,
     Returns:
         A mesh of the sphere.
     """
-    sphere = o3d.geometry.TriangleMesh.create_sphere(radius=radius)
-    sphere.compute_vertex_normals()
-    sphere.translate(position.cpu().numpy())
-    if color is not None:
-        sphere.paint_uniform_color(color)
-    return sphere
+    colors = None if color is None else np.asarray(color).reshape(1, 3)
+    return get_sphere_meshes(position.view(1, 3), radius, colors)[0]